@@ -1,24 +1,29 @@
 from langchain_core.runnables import RunnableConfig
-from langchain_groq.chat_models import ChatGroq
 
 from langchain_core.messages import AnyMessage, AIMessage, HumanMessage
+from langgraph.types import Send
 
 from agents.configuration import Configuration
-from agents.prompts import relevance_prompt, generator_prompt, evaluator_prompt, finalize_prompt, get_current_date
-from agents.schemas import RelevanceCheckerSchema, GeneratorSchema, EvaluatorSchema, EvalEnum, FinalVerdictEnum
-from agents.states import FullState
+from agents.llms import get_llm
+from agents.prompts import (relevance_prompt, decomposer_prompt, generator_prompt, composer_prompt,
+                            evaluator_prompt, finalize_prompt, get_current_date)
+from agents.schemas import (RelevanceCheckerSchema, DecomposerSchema, GeneratorSchema, ComposerSchema,
+                            EvaluatorSchema, EvalEnum, FinalVerdictEnum)
+from agents.states import FullState, SubQueryState
 
-import os
+import re
 from dotenv import load_dotenv
+from sqlglot import parse_one, exp
 from utils.sqlvalidator import SQLValidator
+from utils.evaluator_policy import EvaluatorSkipPolicy
 
 load_dotenv()
 
 def relevance_checker(state: FullState, config: RunnableConfig) -> FullState:
     configurable = Configuration.from_runnable_config(config)
     
-    llm = ChatGroq(
-        api_key=os.environ.get('GROQ_API_KEY'),
+    llm = get_llm(
+        configurable.llm_provider,
         model=configurable.relevance_checker_model,
         temperature=0.3
     )
@@ -47,21 +52,192 @@ def relevance_checker(state: FullState, config: RunnableConfig) -> FullState:
     }
 
 def router_node(state: FullState, config: RunnableConfig):
+    configurable = Configuration.from_runnable_config(config)
+    
     print('----Router----')
     print(f"Evaluation: {state.get('relevance_evaluation').value}")
     
-    if state.get('relevance_evaluation') == EvalEnum.PASS:
+    if state.get('relevance_evaluation') != EvalEnum.PASS:
+        return "finalize_answer"
+    elif configurable.enable_decomposition:
+        return "query_decomposer"
+    else:
         return "sql_generator"
+
+def query_decomposer(state: FullState, config: RunnableConfig) -> FullState:
+    configurable = Configuration.from_runnable_config(config)
+    
+    llm = get_llm(
+        configurable.llm_provider,
+        model=configurable.query_decomposer_model
+    )
+    
+    formatted_prompt = decomposer_prompt.format(
+        curr_date_time=get_current_date(),
+        db_schema=configurable.database_schema,
+        query=state.get('optimized_query')
+    )
+    
+    llm = llm.with_structured_output(DecomposerSchema, method='json_mode')
+    
+    output: DecomposerSchema = llm.invoke(formatted_prompt)
+    
+    # CTE names must be plain identifiers, and must not shadow a real table or each other.
+    # SQL identifiers are case-insensitive, so names are compared in lowercase
+    used_names = {table['table_name'].lower() for table in configurable.database_schema['tables']}
+    sub_queries = []
+    for sub_query in output.sub_queries:
+        name = re.sub(r'\W+', '_', sub_query.name).strip('_').lower()
+        if not name or name[0].isdigit():
+            name = f"cte_{name}"
+        while name in used_names:
+            name = f"{name}_cte"
+        used_names.add(name)
+        sub_queries.append({'name': name, 'question': sub_query.question})
+    
+    print('----Decomposer----')
+    print(output.thoughts)
+    print(f"Sub-queries: {[sub_query['name'] for sub_query in sub_queries]}")
+    
+    return {
+        'sub_queries': sub_queries
+    }
+
+def decomposition_router(state: FullState, config: RunnableConfig):
+    """Router to fan out sub-queries in parallel, or fall back to a single generator"""
+    sub_queries = state.get('sub_queries', [])
+    
+    if len(sub_queries) < 2:
+        return "sql_generator"
+    
+    return [Send("subquery_worker", sub_query) for sub_query in sub_queries]
+
+def subquery_worker(state: SubQueryState, config: RunnableConfig) -> FullState:
+    """Generates and validates a single sub-query, with its own small feedback loop"""
+    configurable = Configuration.from_runnable_config(config)
+    validator = SQLValidator(configurable.database_schema)
+    
+    llm = get_llm(
+        configurable.llm_provider,
+        model=configurable.query_generator_model
+    )
+    llm = llm.with_structured_output(GeneratorSchema, method='json_mode')
+    
+    base_prompt = generator_prompt.format(
+        curr_date_time=get_current_date(),
+        db_schema=configurable.database_schema,
+        query=state['question']
+    )
+    
+    prev_attempts = []
+    result = {'name': state['name'], 'question': state['question'], 'sql': '', 'is_valid': False, 'errors': []}
+    
+    for _ in range(max(configurable.max_subquery_loops, 1)):
+        formatted_prompt = base_prompt
+        if len(prev_attempts) > 0:
+            formatted_prompt += f"\nPrevious Attempts:\n{chr(10).join([f'- {a}' for a in prev_attempts])}"
+        
+        output: GeneratorSchema = llm.invoke(formatted_prompt)
+        sql = output.sql.strip().rstrip(';')
+        validation = validator.validate(sql)
+        
+        result.update(sql=sql, is_valid=validation.get('is_valid'), errors=validation.get('errors', []))
+        if result['is_valid']:
+            break
+        
+        prev_attempts.append(
+            f"# Generated SQL Query\n{sql}\n\n# SQL Validator Feedback\n{chr(10).join(result['errors'])}"
+        )
+    
+    print(f'----Sub-query Worker ({state["name"]})----')
+    print(f"Generated SQL: {result['sql']}")
+    print(f"SQL Valid: {result['is_valid']}")
+    
+    return {
+        'sub_query_results': [result]
+    }
+
+def query_composer(state: FullState, config: RunnableConfig) -> FullState:
+    configurable = Configuration.from_runnable_config(config)
+    
+    results = state.get('sub_query_results', [])
+    
+    print('----Composer----')
+    
+    failed = [r['name'] for r in results if not r['is_valid']]
+    if failed:
+        print(f"Sub-queries failed validation: {failed}, falling back to the generator")
+        return {
+            'generated_query': ''
+        }
+    
+    llm = get_llm(
+        configurable.llm_provider,
+        model=configurable.query_generator_model
+    )
+    
+    ctes = '\n\n'.join(f"-- {r['question']}\n{r['name']} AS (\n{r['sql']}\n)" for r in results)
+    
+    formatted_prompt = composer_prompt.format(
+        curr_date_time=get_current_date(),
+        db_schema=configurable.database_schema,
+        query=state.get('optimized_query'),
+        ctes=ctes
+    )
+    
+    llm = llm.with_structured_output(ComposerSchema, method='json_mode')
+    
+    output: ComposerSchema = llm.invoke(formatted_prompt)
+    print(output.thoughts)
+    
+    final_sql = output.sql.strip().rstrip(';').strip()
+    try:
+        final_query = parse_one(final_sql)
+    except Exception:
+        final_query = None
+    if not isinstance(final_query, exp.Select):
+        print("Composer didn't return a SELECT statement, falling back to the generator")
+        return {
+            'generated_query': ''
+        }
+    
+    cte_list = [f"{r['name']} AS (\n{r['sql']}\n)" for r in results]
+    
+    # The model may write its own WITH clause despite the prompt, keep only the CTEs it added
+    if final_query.args.get('with'):
+        names = {r['name'] for r in results}
+        cte_list += [cte.sql() for cte in final_query.args['with'].expressions if cte.alias not in names]
+        final_query.set('with', None)
+        final_sql = final_query.sql()
+    
+    with_clause = ',\n'.join(cte_list)
+    composed_sql = f"WITH {with_clause}\n{final_sql}"
+    
+    print(f"Composed SQL: {composed_sql}")
+    
+    current_loop = state.get('current_loop_count', 0)
+    max_loops = state.get('max_feedback_loops', configurable.max_feedback_loops)
+    
+    return {
+        'generated_query': composed_sql,
+        'current_loop_count': current_loop,
+        'max_feedback_loops': max_loops
+    }
+
+def composition_router(state: FullState, config: RunnableConfig):
+    """Router to validate the composed query, or fall back to a single generator"""
+    if state.get('generated_query'):
+        return "sql_validator"
     else:
-        return "finalize_answer"
+        return "sql_generator"
 
 def sql_generator(state: FullState, config: RunnableConfig) -> FullState:
     prev_attempts = state.get('previous_attempts', [])
     
     configurable = Configuration.from_runnable_config(config)
     
-    llm = ChatGroq(
-        api_key=os.environ.get('GROQ_API_KEY'),
+    llm = get_llm(
+        configurable.llm_provider,
         model=configurable.query_generator_model
     )
     
@@ -117,9 +293,31 @@ def validation_router(state: FullState, config: RunnableConfig):
 def query_evaluator(state: FullState, config: RunnableConfig) -> FullState:
     configurable = Configuration.from_runnable_config(config)
     
-    llm = ChatGroq(
-        api_key=os.environ.get('GROQ_API_KEY'),
-        model=configurable.query_evaluator_model
+    policy = EvaluatorSkipPolicy(
+        configurable.database_schema,
+        mode=configurable.evaluator_skip_policy,
+        history_path=configurable.evaluator_history_path,
+        max_complexity=configurable.evaluator_skip_max_complexity,
+        min_pass_rate=configurable.evaluator_skip_min_pass_rate,
+        min_samples=configurable.evaluator_skip_min_samples,
+        audit_rate=configurable.evaluator_audit_rate
+    )
+    decision = policy.decide(state.get('user_query'), state.get('generated_query'))
+    
+    print('----Evaluator----')
+    print(f"Evaluation mode: {decision['mode']}")
+    
+    if decision['mode'] == 'skip':
+        print("Evaluation: PASS (skipped)")
+        return {
+            'evaluator_result': EvalEnum.PASS,
+            'evaluator_feedback': '',
+            'evaluator_decisions': [{**decision, 'evaluation': None}]
+        }
+    
+    llm = get_llm(
+        configurable.llm_provider,
+        model=configurable.cheap_evaluator_model if decision['mode'] == 'cheap' else configurable.query_evaluator_model
     )
     
     formatted_prompt = evaluator_prompt.format(
@@ -133,13 +331,17 @@ def query_evaluator(state: FullState, config: RunnableConfig) -> FullState:
     
     output: EvaluatorSchema = llm.invoke(formatted_prompt)
     
-    print('----Evaluator----')
+    # Only full evaluations are trusted for the pass rate history
+    if decision['mode'] == 'full':
+        policy.record(decision['shape'], output.evaluation == EvalEnum.PASS)
+    
     print(output.thoughts)
     print(f"Evaluation: {output.evaluation.value}")
     
     return {
         'evaluator_result': output.evaluation,
-        'evaluator_feedback': output.feedback if output.evaluation == EvalEnum.FAIL else ''
+        'evaluator_feedback': output.feedback if output.evaluation == EvalEnum.FAIL else '',
+        'evaluator_decisions': [{**decision, 'evaluation': output.evaluation.value}]
     }
 
 def evaluator_router(state: FullState, config: RunnableConfig):
@@ -192,8 +394,8 @@ def feedback_router(state: FullState, config: RunnableConfig):
 def finalize_answer(state: FullState, config: RunnableConfig) -> FullState:
     configurable = Configuration.from_runnable_config(config)
     
-    llm = ChatGroq(
-        api_key=os.environ.get('GROQ_API_KEY'),
+    llm = get_llm(
+        configurable.llm_provider,
         model=configurable.finalizing_model
     )
     
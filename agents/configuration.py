@@ -4,6 +4,11 @@ from typing import Any, Optional
 from langchain_core.runnables import RunnableConfig
 
 class Configuration(BaseModel):
+    llm_provider: str = Field(
+        default='groq',
+        description = "'groq', 'fake' for canned offline answers, or an import path 'package.module:factory' to a chat model factory."
+    )
+    
     relevance_checker_model: str = Field(
         default='llama-3.1-8b-instant'
     )
@@ -16,13 +21,57 @@ class Configuration(BaseModel):
         default='moonshotai/kimi-k2-instruct'
     )
     
+    cheap_evaluator_model: str = Field(
+        default='llama-3.1-8b-instant'
+    )
+    
     finalizing_model: str = Field(
         default='moonshotai/kimi-k2-instruct'
     )
     
+    query_decomposer_model: str = Field(
+        default='moonshotai/kimi-k2-instruct'
+    )
+    
     max_feedback_loops: int = Field(
         default=3
     )
+    
+    enable_decomposition: bool = Field(
+        default=False,
+        description = "Split multi-part queries into sub-queries composed as CTEs."
+    )
+    
+    max_subquery_loops: int = Field(
+        default=2
+    )
+
+    evaluator_skip_policy: str = Field(
+        default='never',
+        description = "'never', 'skip' or 'cheap'. How the evaluator handles queries the skip policy deems safe."
+    )
+    
+    evaluator_history_path: Optional[str] = Field(
+        default=None,
+        description = "JSONL file with the evaluator's outcomes per query shape. Required to skip evaluations."
+    )
+    
+    evaluator_skip_max_complexity: int = Field(
+        default=0
+    )
+    
+    evaluator_skip_min_pass_rate: float = Field(
+        default=0.95
+    )
+    
+    evaluator_skip_min_samples: int = Field(
+        default=20
+    )
+    
+    evaluator_audit_rate: float = Field(
+        default=0.1,
+        description = "Fraction of skippable queries that are still evaluated in full."
+    )
 
     database_schema: dict = Field(
         description = "The Database Schema to write the SQL Query for."
@@ -2,12 +2,17 @@ from langgraph.graph import StateGraph, START, END
 from agents.configuration import Configuration
 from agents.states import FullState
 from agents.agents import (relevance_checker, 
+                    query_decomposer,
+                    subquery_worker,
+                    query_composer,
                     sql_generator, 
                     sql_validator, 
                     query_evaluator, 
                     feedback_formatter, 
                     finalize_answer, 
                     router_node, 
+                    decomposition_router,
+                    composition_router,
                     validation_router,
                     feedback_router,
                     evaluator_router) 
@@ -15,6 +20,9 @@ from agents.agents import (relevance_checker,
 graph_builder = StateGraph(FullState, config_schema=Configuration)
 
 graph_builder.add_node('relevance_checker', relevance_checker)
+graph_builder.add_node('query_decomposer', query_decomposer)
+graph_builder.add_node('subquery_worker', subquery_worker)
+graph_builder.add_node('query_composer', query_composer)
 graph_builder.add_node('sql_generator', sql_generator)
 graph_builder.add_node('sql_validator', sql_validator)
 graph_builder.add_node('query_evaluator', query_evaluator)
@@ -27,11 +35,32 @@ graph_builder.add_conditional_edges(
     "relevance_checker",
     router_node,
     [        
+        "query_decomposer",
         "sql_generator",
         "finalize_answer"
     ]
 )
 
+graph_builder.add_conditional_edges(
+    "query_decomposer",
+    decomposition_router,
+    [
+        "subquery_worker",
+        "sql_generator"
+    ]
+)
+
+graph_builder.add_edge("subquery_worker", "query_composer")
+
+graph_builder.add_conditional_edges(
+    "query_composer",
+    composition_router,
+    [
+        "sql_validator",
+        "sql_generator"
+    ]
+)
+
 graph_builder.add_edge("sql_generator", "sql_validator")
 
 graph_builder.add_conditional_edges(
@@ -0,0 +1,76 @@
+import os
+import re
+import importlib
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_groq.chat_models import ChatGroq
+from agents.schemas import (RelevanceCheckerSchema, DecomposerSchema, GeneratorSchema, ComposerSchema,
+                            EvaluatorSchema, EvalEnum)
+
+def get_llm(provider: str, model: str, **kwargs):
+    """
+    Builds the chat model used by an agent node.
+
+    Args:
+        provider (str): 'groq', 'fake' for the offline FakeChatModel, or an import path 'package.module:factory'
+            to a callable that accepts the model name and keyword arguments (e.g. temperature) and returns a
+            LangChain chat model. Useful for local or fake LLMs in evaluations.
+        model (str): The model name.
+
+    Returns:
+        The chat model.
+    """
+    if provider == 'groq':
+        return ChatGroq(
+            api_key=os.environ.get('GROQ_API_KEY'),
+            model=model,
+            **kwargs
+        )
+
+    if provider == 'fake':
+        return FakeChatModel(model=model, **kwargs)
+
+    module_name, _, factory_name = provider.partition(':')
+    if not module_name or not factory_name:
+        raise ValueError(f"Unknown LLM provider '{provider}', expected 'groq', 'fake' or 'package.module:factory'.")
+
+    factory = getattr(importlib.import_module(module_name), factory_name)
+    return factory(model=model, **kwargs)
+
+class FakeChatModel:
+    """
+    An offline stand-in for the chat models, giving canned answers without any API calls.
+
+    It accepts every query as relevant, never splits it, generates 'SELECT COUNT(*)' on the first table
+    of the schema and always passes evaluation. Useful to check that the graph and the evaluation
+    harness run end-to-end, not to measure accuracy.
+    """
+
+    def __init__(self, model: str = 'fake', **kwargs):
+        self.model = model
+
+    def invoke(self, prompt: str) -> AIMessage:
+        return AIMessage(content=f"Canned answer from the fake '{self.model}' model.")
+
+    def with_structured_output(self, schema, method: str = None, **kwargs) -> RunnableLambda:
+        return RunnableLambda(lambda prompt: self._structured_answer(schema, prompt))
+
+    def _structured_answer(self, schema, prompt: str):
+        if schema is RelevanceCheckerSchema:
+            query = re.search(r"User's Query:\n(.*?)\n\n", prompt, re.DOTALL)
+            return schema(
+                thoughts='Fake relevance check.',
+                evaluation=EvalEnum.PASS,
+                optimized_query=query.group(1).strip() if query else ''
+            )
+        if schema is DecomposerSchema:
+            return schema(thoughts='Fake decomposition.', sub_queries=[])
+        if schema is GeneratorSchema:
+            table = re.search(r"'table_name': '([^']+)'", prompt)
+            return schema(thoughts='Fake generation.', sql=f'SELECT COUNT(*) FROM "{table.group(1)}"' if table else 'SELECT 1')
+        if schema is ComposerSchema:
+            cte = re.search(r"^(\w+) AS \($", prompt, re.MULTILINE)
+            return schema(thoughts='Fake composition.', sql=f"SELECT * FROM {cte.group(1)}" if cte else 'SELECT 1')
+        if schema is EvaluatorSchema:
+            return schema(thoughts='Fake evaluation.', evaluation=EvalEnum.PASS, feedback='')
+        raise ValueError(f"The fake LLM has no canned answer for '{schema.__name__}'.")
@@ -26,6 +26,30 @@ User's Query:
 
 """
 
+decomposer_prompt = """You are a senior Database Administrator, and you have access to the database schema. The user will give you a prompt and your
+task is to decide if it asks for multiple independent pieces of information, and if so split it into sub-questions.
+Each sub-question will be answered by its own SQL Query, and the results will be combined as Common Table Expressions (CTEs) in one final query.
+Rules:
+1. Only split the query if it has independent parts, for simple queries return an empty list of sub-queries.
+2. Each sub-question must be self-contained and answerable without the others.
+3. Each sub-question must state which columns its result should expose, so that the final query can join or combine them.
+4. Give each sub-question a short, unique snake_case name that will be used as the CTE name. It MUST NOT match any table name in the schema.
+
+You should respond in JSON format with ALL of these keys:
+- "thoughts" : your thinking process
+- "sub_queries" : list of objects with the keys "name" and "question"
+
+Current Date and Time:
+{curr_date_time}
+
+Database Schema:
+{db_schema}
+
+User's Query:
+{query}
+
+"""
+
 generator_prompt = """You are a senior Database Administrator, and you have access to the database schema. The user will give you a prompt and your
 task is to write an SQL Query that fulfills the user's request. 
 An Evaluator will evaluate your query and check if it is syntactically, semantically correct and satisfies the user's query. 
@@ -47,6 +71,29 @@ User's Query:
 
 """  
     
+composer_prompt = """You are a senior Database Administrator, and you have access to the database schema. The user's query has been split into
+sub-queries, and each of them has already been written as SQL. They will be placed in a WITH clause as Common Table Expressions (CTEs).
+Your task is to write the final SELECT statement that combines the CTEs to fulfill the user's request.
+Refer to the CTEs by their names, and only use the columns they expose. DO NOT write the WITH clause yourself.
+
+You should respond in JSON format with ALL of these keys:
+- "thoughts" : your thinking process
+- "sql" : The Final SELECT statement
+
+Current Date and Time:
+{curr_date_time}
+
+Database Schema:
+{db_schema}
+
+User's Query:
+{query}
+
+Common Table Expressions:
+{ctes}
+
+"""
+    
 evaluator_prompt = """You are a senior Database Administrator, and you have access to the database schema. Evaluate the SQL Query and the user's prompt,
 to understand if the given SQL Query satisfies the user's request.
 Give your answer in the following format:
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import TypedDict, Annotated
+from typing import TypedDict, Annotated, List
 from enum import Enum
 
 class EvalEnum(str, Enum):
@@ -30,6 +30,30 @@ class GeneratorSchema(BaseModel):
         description = 'The Final SQL Query.' 
     )
     
+class SubQuerySchema(BaseModel):
+    name: str = Field(
+        description = 'snake_case name of the CTE holding this sub-query'
+    )
+    question: str = Field(
+        description = 'Self-contained sub-question answerable by a single SQL Query.'
+    )
+
+class DecomposerSchema(BaseModel):
+    thoughts: str = Field(
+        description = 'Reasoning behind the decision'
+    )
+    sub_queries: List[SubQuerySchema] = Field(
+        description = 'Independent sub-questions. Empty or a single item if the query should not be split.'
+    )
+
+class ComposerSchema(BaseModel):
+    thoughts: str = Field(
+        description = 'Reasoning behind the decision'
+    )
+    sql: str = Field(
+        description = 'The Final SELECT statement, referencing the CTEs by name, without the WITH clause.'
+    )
+
 class EvaluatorSchema(BaseModel):
     thoughts: str = Field(
         description = 'Reasoning behind the decision'
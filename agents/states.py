@@ -11,6 +11,9 @@ class FullState(TypedDict):
     optimized_query: str
     relevance_evaluation: EvalEnum
     
+    sub_queries: Optional[List[dict]]
+    sub_query_results: Annotated[list, operator.add]
+    
     generated_query: Optional[str]
     max_feedback_loops: Optional[int]
     current_loop_count: Optional[int]
@@ -18,5 +21,11 @@ class FullState(TypedDict):
     sql_validator_feedback: Optional[List[str]]
     evaluator_result: Optional[EvalEnum]
     evaluator_feedback: Optional[str]
+    evaluator_decisions: Annotated[list, operator.add]
     previous_attempts: Annotated[list, operator.add]
     final_verdict: Optional[FinalVerdictEnum]
+
+
+class SubQueryState(TypedDict):
+    name: str
+    question: str
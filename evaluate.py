@@ -0,0 +1,368 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from agents.configuration import Configuration
+from agents.schemas import FinalVerdictEnum
+from utils.evaluation import (sqlite_schema_json,
+                    execute_sql,
+                    execute_gold_sql,
+                    results_match,
+                    summarize_results,
+                    GoldResultCache)
+
+GRAPH_FAILED_ERROR = "Graph failed"
+
+def load_dataset(dataset_path: str) -> list:
+    """
+    Loads a JSONL dataset, with one example per line having the keys "question", "gold_sql", "db_path"
+    and optionally "id". Relative database paths are resolved against the dataset's directory.
+
+    Raises:
+        ValueError: If two examples share an id, as results, gold lookups and resuming are keyed by it.
+    """
+    dataset_dir = os.path.dirname(os.path.abspath(dataset_path))
+    examples = []
+    seen_ids = set()
+    with open(dataset_path, 'r') as f:
+        for index, line in enumerate(f):
+            if not line.strip():
+                continue
+            example = json.loads(line)
+            example_id = str(example.get('id', index))
+            if example_id in seen_ids:
+                raise ValueError(f"Duplicate example id '{example_id}' on line {index + 1}.")
+            seen_ids.add(example_id)
+            examples.append({
+                'id': example_id,
+                'question': example['question'],
+                'gold_sql': example['gold_sql'],
+                'db_path': os.path.join(dataset_dir, example['db_path']),
+            })
+    return examples
+
+def is_retryable(result: dict) -> bool:
+    """Helper to check if a result failed because of the graph call, rather than a wrong query."""
+    return (result.get('error') or '').startswith(GRAPH_FAILED_ERROR)
+
+def new_result(example: dict, error: str = None) -> dict:
+    """Helper to create the result row of an example, before it is scored."""
+    return {
+        'id': example['id'],
+        'question': example['question'],
+        'gold_sql': example['gold_sql'],
+        'generated_sql': None,
+        'final_verdict': None,
+        'loops_to_pass': None,
+        'correct': False,
+        'evaluator_decisions': [],
+        'error': error,
+        'latency_seconds': 0.0,
+    }
+
+def run_example(example: dict, gold: dict, configurable: dict, query_timeout: float, verbose: bool) -> dict:
+    """Runs the graph on a single example and scores the generated SQL against the gold result."""
+    from langchain_core.messages import HumanMessage
+    from agents.graph import graph
+
+    result = new_result(example)
+
+    if gold['error']:
+        result['error'] = f"Gold query failed: {gold['error']}"
+        return result
+
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(sys.stdout if verbose else devnull):
+            state = graph.invoke(
+                {"messages": [HumanMessage(content=example['question'])]},
+                {"configurable": configurable}
+            )
+    except Exception as e:
+        result['error'] = f"{GRAPH_FAILED_ERROR}: {type(e).__name__}: {e}"
+        return result
+    finally:
+        result['latency_seconds'] = time.perf_counter() - start
+
+    result['generated_sql'] = state.get('generated_query') or None
+    result['final_verdict'] = state.get('final_verdict')
+    result['evaluator_decisions'] = state.get('evaluator_decisions', [])
+    if result['final_verdict'] == FinalVerdictEnum.PASSED_EVALUATOR.value:
+        result['loops_to_pass'] = state.get('current_loop_count', 0) + 1
+
+    if result['generated_sql']:
+        try:
+            generated_rows = execute_sql(example['db_path'], result['generated_sql'], timeout=query_timeout)
+            result['correct'] = results_match(generated_rows, gold['rows'], gold['ordered'])
+        except Exception as e:
+            result['error'] = f"Generated query failed: {e}"
+
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate the Text2SQL Agent's execution accuracy on SQLite benchmarks")
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        required=True,
+        help="Path to JSONL dataset with question, gold_sql and db_path keys",
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        required=True,
+        help="Directory for per-shard results, gold result cache and report",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of worker processes",
+    )
+
+    parser.add_argument(
+        "--num-shards",
+        type=int,
+        default=1,
+        help="Total number of shards the dataset is split into",
+    )
+
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        default=0,
+        help="Index of the shard to run",
+    )
+
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Only evaluate the first N examples of the dataset",
+    )
+
+    parser.add_argument(
+        "--query-timeout",
+        type=float,
+        default=30.0,
+        help="Seconds after which a generated or gold query is interrupted",
+    )
+
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print the agents' output",
+    )
+
+    parser.add_argument(
+        "--max-feedback-loops",
+        type=int,
+        default=3,
+        help="Maximum number of feedback loops",
+    )
+
+    parser.add_argument(
+        "--enable-decomposition",
+        action="store_true",
+        help="Split multi-part queries into sub-queries, generated in parallel and composed as CTEs",
+    )
+
+    parser.add_argument(
+        "--max-subquery-loops",
+        type=int,
+        default=2,
+        help="Maximum number of attempts per sub-query",
+    )
+
+    parser.add_argument(
+        "--evaluator-skip-policy",
+        type=str,
+        choices=["never", "skip", "cheap"],
+        default="never",
+        help="Skip the evaluator, or use a cheaper model, for simple queries with a high historical pass rate",
+    )
+
+    parser.add_argument(
+        "--evaluator-history-path",
+        type=str,
+        default=None,
+        help="Path to JSONL file with the evaluator's outcomes per query shape",
+    )
+
+    parser.add_argument(
+        '--llm-provider',
+        type=str,
+        default='groq',
+        help="'groq', 'fake' for canned offline answers, or an import path 'package.module:factory' to a local chat model factory."
+    )
+
+    parser.add_argument(
+        '--relevance-checker-model',
+        type=str,
+        default='llama-3.1-8b-instant',
+        help='Model for relevance checking.'
+    )
+
+    parser.add_argument(
+        '--query-generator-model',
+        type=str,
+        default='moonshotai/kimi-k2-instruct',
+        help='Model for query generation.'
+    )
+
+    parser.add_argument(
+        '--query-evaluator-model',
+        type=str,
+        default='moonshotai/kimi-k2-instruct',
+        help='Model for query evaluation.'
+    )
+
+    parser.add_argument(
+        '--cheap-evaluator-model',
+        type=str,
+        default='llama-3.1-8b-instant',
+        help='Model for query evaluation of simple queries, with the cheap skip policy.'
+    )
+
+    parser.add_argument(
+        '--finalizing-model',
+        type=str,
+        default='moonshotai/kimi-k2-instruct',
+        help='Model for finalizing SQL.'
+    )
+
+    parser.add_argument(
+        '--query-decomposer-model',
+        type=str,
+        default='moonshotai/kimi-k2-instruct',
+        help='Model for query decomposition.'
+    )
+
+    args = parser.parse_args()
+
+    if not 0 <= args.shard_index < args.num_shards:
+        print(f"Shard index must be between 0 and {args.num_shards - 1}.")
+        return
+
+    try:
+        examples = load_dataset(args.dataset)[:args.limit]
+    except Exception as e:
+        print(f"Error occured while loading dataset: {e}")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    results_path = os.path.join(args.output_dir, f"results-shard{args.shard_index}-of-{args.num_shards}.jsonl")
+
+    # Resume from the examples already completed by this shard. Graph failures are mostly API errors
+    # (rate limits, timeouts), not misses of the agent, so those examples are retried
+    completed = set()
+    if os.path.exists(results_path):
+        with open(results_path, 'r') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        completed = {row['id'] for row in rows if not is_retryable(row)}
+
+    pending = [
+        example for index, example in enumerate(examples)
+        if index % args.num_shards == args.shard_index and example['id'] not in completed
+    ]
+    print(f"Shard {args.shard_index}/{args.num_shards}: {len(completed)} completed, {len(pending)} pending.")
+
+    schemas = {}
+    for example in pending:
+        if example['db_path'] not in schemas:
+            schemas[example['db_path']] = sqlite_schema_json(example['db_path'])
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor, open(results_path, 'a') as results_file:
+        # Gold queries missing from the cache run on the pool, as they dominate cold runs on large benchmarks
+        gold_cache = GoldResultCache(os.path.join(args.output_dir, 'gold_cache.json'))
+        misses = {
+            (example['db_path'], example['gold_sql']) for example in pending
+            if not gold_cache.contains(example['db_path'], example['gold_sql'])
+        }
+        gold_futures = {
+            executor.submit(execute_gold_sql, db_path, sql, args.query_timeout): (db_path, sql)
+            for db_path, sql in misses
+        }
+        for future in as_completed(gold_futures):
+            try:
+                gold_cache.put(*gold_futures[future], future.result())
+            except Exception as e:
+                # Left uncached, so the gold query is retried in this process below
+                print(f"Gold query failed on the pool: {type(e).__name__}: {e}")
+        if misses:
+            gold_cache.save()
+            print(f"Computed {len(misses)} gold results.")
+
+        golds = {
+            example['id']: gold_cache.get(example['db_path'], example['gold_sql'], timeout=args.query_timeout)
+            for example in pending
+        }
+
+        futures = {}
+        failed = []
+        for example in pending:
+            config = Configuration(
+                llm_provider=args.llm_provider,
+                database_schema=schemas[example['db_path']],
+                relevance_checker_model=args.relevance_checker_model,
+                query_generator_model=args.query_generator_model,
+                query_evaluator_model=args.query_evaluator_model,
+                cheap_evaluator_model=args.cheap_evaluator_model,
+                finalizing_model=args.finalizing_model,
+                query_decomposer_model=args.query_decomposer_model,
+                max_feedback_loops=args.max_feedback_loops,
+                enable_decomposition=args.enable_decomposition,
+                max_subquery_loops=args.max_subquery_loops,
+                evaluator_skip_policy=args.evaluator_skip_policy,
+                evaluator_history_path=args.evaluator_history_path
+            )
+            try:
+                future = executor.submit(
+                    run_example, example, golds[example['id']], config.model_dump(), args.query_timeout, args.verbose
+                )
+            except Exception as e:
+                # The pool is already broken, e.g. after a worker was killed
+                failed.append(new_result(example, f"{GRAPH_FAILED_ERROR}: {type(e).__name__}: {e}"))
+                continue
+            futures[future] = example
+
+        def completed_results():
+            yield from failed
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # Worker crashes (e.g. BrokenProcessPool after an OOM kill) are saved as retryable,
+                    # so resuming picks the example up again
+                    yield new_result(futures[future], f"{GRAPH_FAILED_ERROR}: {type(e).__name__}: {e}")
+
+        for done, result in enumerate(completed_results(), start=1):
+            results_file.write(json.dumps(result) + '\n')
+            results_file.flush()
+            print(f"[{done}/{len(pending)}] {result['id']}: correct={result['correct']} "
+                  f"latency={result['latency_seconds']:.1f}s" + (f" error={result['error']}" if result['error'] else ''))
+
+    # Report over every shard completed so far, retried examples keep their latest result
+    results = {}
+    for path in sorted(glob.glob(os.path.join(args.output_dir, f"results-shard*-of-{args.num_shards}.jsonl"))):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    results[row['id']] = row
+
+    report = summarize_results(list(results.values()))
+    with open(os.path.join(args.output_dir, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
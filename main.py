@@ -27,6 +27,41 @@ def main() -> None:
         help="Maximum number of feedback loops",
     )
     
+    parser.add_argument(
+        "--enable-decomposition",
+        action="store_true",
+        help="Split multi-part queries into sub-queries, generated in parallel and composed as CTEs",
+    )
+    
+    parser.add_argument(
+        "--max-subquery-loops",
+        type=int,
+        default=2,
+        help="Maximum number of attempts per sub-query",
+    )
+    
+    parser.add_argument(
+        "--evaluator-skip-policy",
+        type=str,
+        choices=["never", "skip", "cheap"],
+        default="never",
+        help="Skip the evaluator, or use a cheaper model, for simple queries with a high historical pass rate",
+    )
+    
+    parser.add_argument(
+        "--evaluator-history-path",
+        type=str,
+        default=None,
+        help="Path to JSONL file with the evaluator's outcomes per query shape",
+    )
+    
+    parser.add_argument(
+        '--llm-provider', 
+        type=str, 
+        default='groq',
+        help="'groq', 'fake' for canned offline answers, or an import path 'package.module:factory' to a local chat model factory."
+    )
+    
     parser.add_argument(
         '--relevance-checker-model', 
         type=str, 
@@ -48,12 +83,26 @@ def main() -> None:
         help='Model for query evaluation.'
     )
     
+    parser.add_argument(
+        '--cheap-evaluator-model', 
+        type=str, 
+        default='llama-3.1-8b-instant',
+        help='Model for query evaluation of simple queries, with the cheap skip policy.'
+    )
+    
     parser.add_argument(
         '--finalizing-model', 
         type=str, 
         default='moonshotai/kimi-k2-instruct',
         help='Model for finalizing SQL.'
     )
+    
+    parser.add_argument(
+        '--query-decomposer-model', 
+        type=str, 
+        default='moonshotai/kimi-k2-instruct',
+        help='Model for query decomposition.'
+    )
 
     args = parser.parse_args()
 
@@ -70,12 +119,19 @@ def main() -> None:
     }
     
     config = Configuration(
+        llm_provider=args.llm_provider,
         database_schema=db_schema,
         relevance_checker_model=args.relevance_checker_model,
         query_generator_model=args.query_generator_model,
         query_evaluator_model=args.query_evaluator_model,
+        cheap_evaluator_model=args.cheap_evaluator_model,
         finalizing_model=args.finalizing_model,
-        max_feedback_loops=args.max_feedback_loops
+        query_decomposer_model=args.query_decomposer_model,
+        max_feedback_loops=args.max_feedback_loops,
+        enable_decomposition=args.enable_decomposition,
+        max_subquery_loops=args.max_subquery_loops,
+        evaluator_skip_policy=args.evaluator_skip_policy,
+        evaluator_history_path=args.evaluator_history_path
     )
     
     result = graph.invoke(state, {"configurable": config.model_dump()})
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+from collections import Counter
+from contextlib import closing
+from sqlglot import parse_one
+
+def sqlite_schema_json(db_path: str) -> dict:
+    """
+    Derives the Database Schema JSON (as used by the agents) from a SQLite database file.
+
+    Args:
+        db_path (str): The file path to the SQLite database.
+
+    Returns:
+        dict: The schema, with column types, primary and foreign keys as column descriptions.
+    """
+    tables = []
+    with closing(_connect_read_only(db_path)) as conn:
+        table_names = [
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )
+        ]
+        for table_name in table_names:
+            quoted = table_name.replace('"', '""')
+            foreign_keys = {
+                row[3]: f"{row[2]}.{row[4]}"
+                for row in conn.execute(f'PRAGMA foreign_key_list("{quoted}")')
+            }
+            columns = {}
+            for _, col_name, col_type, _, _, pk in conn.execute(f'PRAGMA table_info("{quoted}")'):
+                description = col_type or 'ANY'
+                if pk:
+                    description += ", Primary Key"
+                if col_name in foreign_keys:
+                    description += f", Foreign Key to {foreign_keys[col_name]}"
+                columns[col_name] = description
+            tables.append({'table_name': table_name, 'description': '', 'columns': columns})
+
+    return {'tables': tables}
+
+def execute_sql(db_path: str, sql: str, timeout: float = 30.0) -> list:
+    """
+    Executes a query on a read-only connection to a SQLite database.
+
+    Args:
+        db_path (str): The file path to the SQLite database.
+        sql (str): The SQL query to execute.
+        timeout (float): Seconds after which the query is interrupted.
+
+    Returns:
+        list: The result rows, with values converted to JSON-serializable types.
+    """
+    deadline = time.monotonic() + timeout
+    with closing(_connect_read_only(db_path)) as conn:
+        # Returning non-zero from the progress handler aborts the running query
+        conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 10000)
+        rows = conn.execute(sql).fetchall()
+
+    return [[_normalize_value(value) for value in row] for row in rows]
+
+def results_match(generated_rows: list, gold_rows: list, ordered: bool) -> bool:
+    """
+    Compares two result sets for execution accuracy.
+
+    Rows are compared as multisets, unless the gold query defines an order. Column names
+    are ignored, but column order matters.
+    """
+    generated_rows = [tuple(row) for row in generated_rows]
+    gold_rows = [tuple(row) for row in gold_rows]
+    if ordered:
+        return generated_rows == gold_rows
+    return Counter(generated_rows) == Counter(gold_rows)
+
+def is_ordered_query(sql: str) -> bool:
+    """Helper to check if the outermost query has an ORDER BY clause."""
+    try:
+        return parse_one(sql, read='sqlite').args.get('order') is not None
+    except Exception:
+        return False
+
+def execute_gold_sql(db_path: str, sql: str, timeout: float = 30.0) -> dict:
+    """
+    Executes a gold query, keeping the execution error instead of raising it.
+
+    Returns:
+        dict: A dictionary containing the 'rows', whether they are 'ordered', and an 'error' if execution failed.
+    """
+    try:
+        return {'rows': execute_sql(db_path, sql, timeout=timeout), 'ordered': is_ordered_query(sql), 'error': None}
+    except Exception as e:
+        return {'rows': [], 'ordered': False, 'error': str(e)}
+
+class GoldResultCache:
+    """
+    A JSON file cache of gold query results, so each gold query is executed only once
+    across runs and shards.
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self.results = self._load()
+
+    @staticmethod
+    def key(db_path: str, sql: str) -> str:
+        return hashlib.sha256(f"{os.path.abspath(db_path)}\n{sql}".encode()).hexdigest()
+
+    def contains(self, db_path: str, sql: str) -> bool:
+        return self.key(db_path, sql) in self.results
+
+    def put(self, db_path: str, sql: str, result: dict):
+        """Stores a gold result computed elsewhere, e.g. by execute_gold_sql in a worker process."""
+        self.results[self.key(db_path, sql)] = result
+
+    def get(self, db_path: str, sql: str, timeout: float = 30.0) -> dict:
+        """
+        Returns the cached gold result, executing the query on a cache miss.
+
+        Returns:
+            dict: A dictionary containing the 'rows', whether they are 'ordered', and an 'error' if execution failed.
+        """
+        key = self.key(db_path, sql)
+        if key not in self.results:
+            self.results[key] = execute_gold_sql(db_path, sql, timeout=timeout)
+        return self.results[key]
+
+    def save(self):
+        # Merge with the entries other shards saved since loading, as they may share the output directory
+        self.results = {**self._load(), **self.results}
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.cache_path)), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.results, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+def summarize_results(results: list) -> dict:
+    """
+    Aggregates per-example evaluation results into a report.
+
+    Returns:
+        dict: Execution accuracy, evaluator pass rate and loops-to-pass distribution (without skipped evaluations),
+            evaluator skip precision and latency statistics.
+    """
+    total = len(results)
+    if total == 0:
+        return {'total': 0}
+
+    latencies = sorted(r['latency_seconds'] for r in results)
+
+    # Examples passed by a skipped evaluation are reported apart from the evaluator's own passes
+    skipped = [r for r in results if _is_skipped(r)]
+    evaluated = [r for r in results if not _is_skipped(r)]
+
+    # Number of generator attempts it took to pass the evaluator, 'failed' if it never passed
+    loops_to_pass = Counter(
+        str(r['loops_to_pass']) if r['loops_to_pass'] is not None else 'failed'
+        for r in evaluated
+    )
+
+    return {
+        'total': total,
+        'execution_accuracy': sum(r['correct'] for r in results) / total,
+        'evaluator_pass_rate': (
+            sum(r['loops_to_pass'] is not None for r in evaluated) / len(evaluated) if evaluated else None
+        ),
+        'errors': sum(r['error'] is not None for r in results),
+        'loops_to_pass': dict(sorted(loops_to_pass.items())),
+        'evaluator_modes': dict(Counter(
+            d['mode'] for r in results for d in r.get('evaluator_decisions', [])
+        )),
+        'evaluator_skips': len(skipped),
+        # Share of the examples passed by a skipped evaluation whose SQL is actually correct
+        'skip_precision': sum(r['correct'] for r in skipped) / len(skipped) if skipped else None,
+        'latency_seconds': {
+            'mean': sum(latencies) / total,
+            'p50': _percentile(latencies, 0.5),
+            'p95': _percentile(latencies, 0.95),
+            'max': latencies[-1],
+        },
+    }
+
+def _is_skipped(result: dict) -> bool:
+    """Helper to check if the last evaluation of an example was skipped by the evaluator skip policy."""
+    decisions = result.get('evaluator_decisions')
+    return bool(decisions) and decisions[-1]['mode'] == 'skip'
+
+def _connect_read_only(db_path: str) -> sqlite3.Connection:
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"SQLite database '{db_path}' does not exist.")
+    return sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+
+def _normalize_value(value):
+    """Helper to make result values JSON-serializable and comparable across queries."""
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+def _percentile(sorted_values: list, q: float) -> float:
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
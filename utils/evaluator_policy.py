@@ -0,0 +1,284 @@
+import os
+import re
+import json
+import random
+import threading
+from sqlglot import parse_one, exp
+
+# Aggregated history per file, shared by the policies of a process, so each call only reads the new lines
+_history_cache = {}
+_history_lock = threading.Lock()
+
+class EvaluatorSkipPolicy:
+    """
+    A class to decide if the semantic LLM evaluation of a validated SQL query can be skipped,
+    or run with a cheaper model.
+
+    The decision uses signals that are available locally:
+    1.  Entity Coverage: Tables and columns named in the question should be referenced by the query,
+        every table referenced by the query should be named in the question, and the values in the
+        question (quoted strings, numbers and proper nouns) should appear in the query's literals.
+    2.  Complexity: Joins, subqueries, CTEs, set operations, window functions and grouping.
+    3.  History: Pass rate of the full evaluator for questions and queries of the same shape, stored on disk.
+
+    A fraction of eligible queries is still evaluated in full ('audit'), so the history stays current
+    and the skip precision can be checked later.
+    """
+    MODES = {"never", "skip", "cheap"}
+
+    # Question wording that asks for a filter, a ranking or an exclusion, used in the question's shape
+    COMPARISON_WORDS = {"than", "greater", "fewer", "over", "under", "above", "below", "between",
+                        "before", "after", "since", "until", "exactly", "equal", "equals"}
+    RANKING_WORDS = {"top", "most", "least", "highest", "lowest", "largest", "smallest", "best", "worst",
+                     "first", "last", "bottom"}
+    NEGATION_WORDS = {"not", "no", "without", "except", "never", "excluding"}
+
+    def __init__(self, schema_json: dict, mode: str = "never", history_path: str = None,
+                 max_complexity: int = 0, min_pass_rate: float = 0.95, min_samples: int = 20,
+                 audit_rate: float = 0.1):
+        """
+        Initializes the policy with a database schema.
+
+        Args:
+            schema_json (dict): The Database Schema JSON.
+            mode (str): 'never' always runs the full evaluator, 'skip' skips it and 'cheap' uses a cheaper model for eligible queries.
+            history_path (str): The file path to the JSONL evaluator history. Without it, no query is eligible.
+            max_complexity (int): Maximum complexity score of an eligible query.
+            min_pass_rate (float): Minimum historical pass rate of the query's shape.
+            min_samples (int): Minimum number of historical evaluations of the query's shape.
+            audit_rate (float): Fraction of eligible queries that are still evaluated in full.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown evaluator skip policy '{mode}', expected one of {sorted(self.MODES)}.")
+
+        self.mode = mode
+        self.history_path = history_path
+        self.max_complexity = max_complexity
+        self.min_pass_rate = min_pass_rate
+        self.min_samples = min_samples
+        self.audit_rate = audit_rate
+
+        # Pre-process the schema into normalized name tokens, e.g. 'order_items' -> ('order', 'item')
+        self.table_tokens = {
+            table['table_name']: self._tokenize(table['table_name'])
+            for table in schema_json['tables']
+        }
+        # Key columns (e.g. 'customer_id') are left out, they would match whenever their table is named
+        self.column_tokens = {
+            table['table_name']: {
+                column: tokens
+                for column in table['columns'].keys()
+                if 'id' not in (tokens := self._tokenize(column))
+            }
+            for table in schema_json['tables']
+        }
+
+    def decide(self, question: str, sql_query: str) -> dict:
+        """
+        Decides how a validated SQL query should be evaluated.
+
+        Args:
+            question (str): The user's question.
+            sql_query (str): The validated SQL query.
+
+        Returns:
+            dict: The decision, with the 'mode' ('full', 'cheap' or 'skip'), the query 'shape',
+                the signals it was based on and the 'reasons' it isn't skipped.
+        """
+        signals = self._query_signals(question, sql_query)
+        history = {'passes': 0, 'total': 0}
+        if self.mode != "never":
+            history = self._load_history().get(signals['shape'], history)
+        pass_rate = history['passes'] / history['total'] if history['total'] else None
+
+        reasons = []
+        if self.mode == "never":
+            reasons.append("Policy is disabled.")
+        if signals['complexity'] > self.max_complexity:
+            reasons.append(f"Complexity {signals['complexity']} is above {self.max_complexity}.")
+        if signals['unreferenced_tables']:
+            reasons.append(f"Tables named in the question are not referenced: {signals['unreferenced_tables']}.")
+        if signals['unmentioned_tables']:
+            reasons.append(f"Referenced tables are not named in the question: {signals['unmentioned_tables']}.")
+        if signals['unreferenced_columns']:
+            reasons.append(f"Columns named in the question are not referenced: {signals['unreferenced_columns']}.")
+        if signals['missing_values']:
+            reasons.append(f"Values in the question are not in the query's literals: {signals['missing_values']}.")
+        if history['total'] < self.min_samples:
+            reasons.append(f"Only {history['total']} evaluations of this shape, need {self.min_samples}.")
+        elif pass_rate is None:
+            reasons.append("No evaluations of this shape yet.")
+        elif pass_rate < self.min_pass_rate:
+            reasons.append(f"Pass rate {pass_rate:.2f} of this shape is below {self.min_pass_rate}.")
+
+        audited = not reasons and random.random() < self.audit_rate
+        if audited:
+            reasons.append("Audit of an eligible query.")
+
+        return {
+            'mode': self.mode if not reasons else 'full',
+            'eligible': not reasons or audited,
+            'audited': audited,
+            'shape': signals['shape'],
+            'complexity': signals['complexity'],
+            'tables': signals['tables'],
+            'unreferenced_tables': signals['unreferenced_tables'],
+            'unmentioned_tables': signals['unmentioned_tables'],
+            'unreferenced_columns': signals['unreferenced_columns'],
+            'question_values': signals['question_values'],
+            'missing_values': signals['missing_values'],
+            'history_pass_rate': pass_rate,
+            'history_samples': history['total'],
+            'reasons': reasons,
+        }
+
+    def record(self, shape: str, passed: bool):
+        """Records the result of a full evaluation in the on-disk history."""
+        if not self.history_path:
+            return
+
+        # One JSON line per outcome, in a single append, so processes sharing the file never overwrite each other
+        line = json.dumps({'shape': shape, 'passed': bool(passed)}) + '\n'
+        with open(self.history_path, 'a') as f:
+            f.write(line)
+
+    def _load_history(self) -> dict:
+        """
+        Helper to aggregate the history lines into pass counts per shape.
+
+        The counts are cached per process, and only the lines appended since the last call are read.
+        The returned dictionary is shared, and must not be modified.
+        """
+        if not self.history_path or not os.path.exists(self.history_path):
+            return {}
+
+        path = os.path.abspath(self.history_path)
+        with _history_lock:
+            stat = os.stat(path)
+            cached = _history_cache.get(path)
+            # Start over if the file was replaced or truncated
+            if cached is None or cached['inode'] != stat.st_ino or stat.st_size < cached['offset']:
+                cached = _history_cache[path] = {'inode': stat.st_ino, 'offset': 0, 'history': {}}
+
+            if stat.st_size > cached['offset']:
+                with open(path, 'rb') as f:
+                    f.seek(cached['offset'])
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            # Partially written while another process appends it, read on the next call
+                            break
+                        cached['offset'] += len(line)
+                        try:
+                            outcome = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        entry = cached['history'].setdefault(outcome['shape'], {'passes': 0, 'total': 0})
+                        entry['passes'] += int(outcome['passed'])
+                        entry['total'] += 1
+
+            return cached['history']
+
+    def _query_signals(self, question: str, sql_query: str) -> dict:
+        """Helper to extract the entity coverage, complexity and shape of a query."""
+        parsed = parse_one(sql_query)
+
+        cte_names = {cte.alias for cte in parsed.find_all(exp.CTE)}
+        tables = sorted({
+            table.this.name for table in parsed.find_all(exp.Table)
+            if table.this.name not in cte_names
+        })
+        columns = {column.this.name for column in parsed.find_all(exp.Column)}
+
+        question_tokens = self._tokenize(question)
+        mentioned_tables = {
+            table for table, tokens in self.table_tokens.items()
+            if tokens and tokens <= question_tokens
+        }
+        # Only columns of the referenced tables, other tables' columns are too noisy
+        mentioned_columns = {
+            (table, column) for table in tables
+            for column, tokens in self.column_tokens.get(table, {}).items()
+            if tokens and tokens <= question_tokens
+        }
+
+        joins = len(list(parsed.find_all(exp.Join)))
+        subqueries = len(list(parsed.find_all(exp.Subquery)))
+        set_operations = len(list(parsed.find_all(exp.Union, exp.Intersect, exp.Except)))
+        windows = len(list(parsed.find_all(exp.Window)))
+        has_group = parsed.find(exp.Group) is not None
+        has_having = parsed.find(exp.Having) is not None
+        has_aggregate = parsed.find(exp.AggFunc) is not None
+
+        complexity = (joins + windows + int(has_group) + int(has_having)
+                      + 2 * (subqueries + len(cte_names) + set_operations))
+
+        # Values the question asks about must show up in the query's literals, e.g. 'Paris' in a WHERE clause
+        question_values = self._question_values(question)
+        literals = '\n'.join(str(literal.this).lower() for literal in parsed.find_all(exp.Literal))
+        missing_values = [value for value in question_values if value.lower() not in literals]
+
+        # The shape covers both the question and the query, so a query dropping a filter the question asks for
+        # isn't judged by the history of filter-less questions. The raw complexity and a fixed cap on the
+        # number of values are kept, so the history doesn't depend on the configured thresholds
+        question_words = set(re.findall(r'[a-z]+', question.lower()))
+        shape = '|'.join([
+            f"tables={len(tables)}",
+            f"complexity={complexity}",
+            "aggregate" if has_aggregate else "no_aggregate",
+            "filter" if parsed.find(exp.Where) is not None else "no_filter",
+            "order" if parsed.find(exp.Order) is not None else "no_order",
+            f"question_values={min(len(question_values), 3)}",
+            "question_comparison" if question_words & self.COMPARISON_WORDS else "no_question_comparison",
+            "question_ranking" if question_words & self.RANKING_WORDS else "no_question_ranking",
+            "question_negation" if question_words & self.NEGATION_WORDS else "no_question_negation",
+        ])
+
+        return {
+            'tables': tables,
+            'complexity': complexity,
+            'shape': shape,
+            'unreferenced_tables': sorted(mentioned_tables - set(tables)),
+            # A table counts as named if the table or one of its columns is named
+            'unmentioned_tables': sorted(
+                table for table in tables
+                if table not in mentioned_tables and not any(t == table for t, _ in mentioned_columns)
+            ),
+            'unreferenced_columns': sorted(
+                f"{table}.{column}" for table, column in mentioned_columns if column not in columns
+            ),
+            'question_values': question_values,
+            'missing_values': missing_values,
+        }
+
+    def _question_values(self, question: str) -> list:
+        """Helper to extract quoted strings, numbers and proper nouns from the question."""
+        values = [a or b for a, b in re.findall(r"'([^']+)'|\"([^\"]+)\"", question)]
+        unquoted = re.sub(r"'[^']+'|\"[^\"]+\"", ' ', question)
+
+        values += re.findall(r'\b\d+(?:\.\d+)?\b', unquoted)
+
+        # Capitalized words, except at the start of a sentence or when naming a table or column
+        schema_tokens = set().union(
+            *self.table_tokens.values(),
+            *(tokens for columns in self.column_tokens.values() for tokens in columns.values())
+        )
+        for match in re.finditer(r'\b[A-Z][a-zA-Z]+\b', unquoted):
+            if re.search(r'(^|[.!?:]\s*)$', unquoted[:match.start()]):
+                continue
+            if self._tokenize(match.group()) <= schema_tokens:
+                continue
+            values.append(match.group())
+
+        return list(dict.fromkeys(values))
+
+    @staticmethod
+    def _tokenize(text: str) -> set:
+        """Helper to split text into lowercase, roughly singular word tokens."""
+        tokens = set()
+        for word in re.findall(r'[a-z0-9]+', text.lower()):
+            if word.endswith('ies') and len(word) > 4:
+                word = word[:-3] + 'y'
+            elif word.endswith('s') and not word.endswith('ss') and len(word) > 3:
+                word = word[:-1]
+            tokens.add(word)
+        return tokens
@@ -8,7 +8,8 @@ class SQLValidator:
     The validation process includes:
     1.  Safety Check: Ensures the query is read-only (no DELETE, UPDATE, etc.).
     2.  Syntax Check: Verifies the SQL is syntactically correct.
-    3.  Schema Check: Confirms all tables and columns exist in the schema.
+    3.  Schema Check: Confirms all tables and columns exist in the schema,
+        or in a Common Table Expression (CTE) defined by the query.
     """
     UNSAFE_COMMANDS = {"DELETE", "UPDATE", "INSERT", "DROP", "ALTER", "TRUNCATE", "GRANT", "REVOKE"}
 
@@ -58,45 +59,8 @@ class SQLValidator:
                     errors.append(f"Only SELECT statements are allowed. Found '{command_name}'.")
                 return {"is_valid": False, "errors": errors}
 
-            # 2. Schema Check using the parsed expression
-            # Build a map of all aliases to their real table names for context
-            table_context = self._get_table_context(parsed)
-
-            # 2a. Validate tables
-            for table in parsed.find_all(exp.Table):
-                table_name = table.this.name
-                if table_name not in self.tables:
-                    errors.append(f"Table '{table_name}' does not exist.")
-            
-            if errors: # Don't check columns if tables are invalid
-                return {"is_valid": False, "errors": errors}
-
-            # 2b. Validate columns
-            for column in parsed.find_all(exp.Column):
-                if column.this.name == '*': # Ignore '*' wildcard
-                    continue
-
-                col_name = column.this.name
-                table_alias = column.table # The alias or table name used, e.g., 'u' in 'u.name'
-
-                if table_alias:
-                    # Column is qualified (e.g., users.name)
-                    real_table = table_context.get(table_alias)
-                    if not real_table:
-                         # This case is rare as sqlglot would likely fail parsing if the alias doesn't exist
-                         errors.append(f"Table alias or name '{table_alias}' not found in query context.")
-                         continue
-                    if col_name not in self.columns.get(real_table, set()):
-                        errors.append(f"Column '{col_name}' does not exist in table '{real_table}'.")
-                else:
-                    # Column is unqualified (e.g., name). Check if it exists in any table in the query.
-                    found = False
-                    for table_name in table_context.values():
-                        if col_name in self.columns.get(table_name, set()):
-                            found = True
-                            break
-                    if not found:
-                        errors.append(f"Unqualified column '{col_name}' could not be found in any of the query's tables.")
+            # 2. Schema Check, each CTE body first, then the outer query
+            errors.extend(self._validate_query(parsed, {}))
 
         except Exception as e:
             # Catches syntax errors from sqlglot during parsing
@@ -108,6 +72,102 @@ class SQLValidator:
         
         return {"is_valid": True, "errors": []}
 
+    def _validate_query(self, parsed: exp.Select, cte_columns: dict) -> list:
+        """
+        Validates a SELECT statement and the CTEs of its WITH clause, including CTEs nested in CTE bodies.
+
+        CTEs are treated as extra tables exposing their projected columns, visible to the CTEs after them
+        and to the statement itself.
+
+        Args:
+            parsed (exp.Select): The parsed SELECT statement.
+            cte_columns (dict): Mapping of CTE names visible from enclosing queries to their column names.
+
+        Returns:
+            list: The schema errors found in the statement.
+        """
+        errors = []
+        cte_columns = dict(cte_columns)
+
+        with_clause = parsed.args.get('with')
+        for cte in (with_clause.expressions if with_clause else []):
+            if not isinstance(cte.this, exp.Select):
+                errors.append(f"CTE '{cte.alias}' must be a single SELECT statement.")
+                continue
+            cte_errors = self._validate_query(cte.this, cte_columns)
+            errors.extend(f"CTE '{cte.alias}': {error}" for error in cte_errors)
+            cte_columns[cte.alias] = set(cte.this.named_selects)
+
+        if errors: # Don't check the outer query if a CTE is invalid
+            return errors
+
+        if not with_clause:
+            return self._validate_select(parsed, cte_columns)
+
+        outer_query = parsed.copy()
+        outer_query.set('with', None)
+        return self._validate_select(outer_query, cte_columns)
+
+    def _validate_select(self, parsed: exp.Select, cte_columns: dict) -> list:
+        """
+        Validates the tables and columns of a single SELECT statement.
+
+        Args:
+            parsed (exp.Select): The parsed SELECT statement, without a WITH clause.
+            cte_columns (dict): Mapping of CTE names visible to the statement to their column names.
+
+        Returns:
+            list: The schema errors found in the statement.
+        """
+        errors = []
+
+        # Build a map of all aliases to their real table names for context
+        table_context = self._get_table_context(parsed)
+
+        # Validate tables
+        for table in parsed.find_all(exp.Table):
+            table_name = table.this.name
+            if table_name not in self.tables and table_name not in cte_columns:
+                errors.append(f"Table '{table_name}' does not exist.")
+
+        if errors: # Don't check columns if tables are invalid
+            return errors
+
+        # Validate columns
+        for column in parsed.find_all(exp.Column):
+            if column.this.name == '*': # Ignore '*' wildcard
+                continue
+
+            col_name = column.this.name
+            table_alias = column.table # The alias or table name used, e.g., 'u' in 'u.name'
+
+            if table_alias:
+                # Column is qualified (e.g., users.name)
+                real_table = table_context.get(table_alias)
+                if not real_table:
+                     # This case is rare as sqlglot would likely fail parsing if the alias doesn't exist
+                     errors.append(f"Table alias or name '{table_alias}' not found in query context.")
+                     continue
+                if not self._has_column(real_table, col_name, cte_columns):
+                    errors.append(f"Column '{col_name}' does not exist in table '{real_table}'.")
+            else:
+                # Column is unqualified (e.g., name). Check if it exists in any table in the query.
+                found = any(
+                    self._has_column(table_name, col_name, cte_columns)
+                    for table_name in table_context.values()
+                )
+                if not found:
+                    errors.append(f"Unqualified column '{col_name}' could not be found in any of the query's tables.")
+
+        return errors
+
+    def _has_column(self, table_name: str, col_name: str, cte_columns: dict) -> bool:
+        """Helper to check a column against the schema, or against a CTE's projected columns."""
+        if table_name in cte_columns:
+            # A CTE selecting '*' exposes columns we can't resolve here, so accept them
+            return col_name in cte_columns[table_name] or '*' in cte_columns[table_name]
+        return col_name in self.columns.get(table_name, set())
+
     def _get_table_context(self, parsed_query: exp.Expression) -> dict:
         """Helper to create a mapping from table aliases to real table names."""
         context = {}